@@ -4,6 +4,7 @@ import os
 from tqdm import tqdm
 import time
 from dotenv import load_dotenv, find_dotenv
+from trend_report import read_trend_sheets, write_trend_sheets
 load_dotenv(find_dotenv("setvar.env"))
 
 # Configuration
@@ -12,6 +13,8 @@ OUTPUT_FILE = 'Trust_Pilot_Review_Analysis.xlsx'
 COMMENT_COLUMN = 'text'
 OPENAI_MODEL = "gpt-4-1106-preview"
 MAX_THEMATICS = 10
+# Broad categories themes are consolidated into, also used as stable labels for the trend sheets
+THEME_CATEGORIES = ['moderation', 'customer support', 'website usability', 'trustworthiness', 'overall satisfaction']
 
 # Set up OpenAI client with API key
 client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
@@ -48,7 +51,7 @@ def summarize_review(review):
         return []
 
 def classify_reviews(reviews):
-    """Classify reviews into themes and return analysis."""
+    """Classify reviews into themes and return analysis with the review indices of each theme."""
     # Dictionary to track themes and reviews
     theme_reviews = {}  # {theme: [review_indices]}
     processed_reviews_count = 0  # Track how many reviews were actually processed
@@ -110,7 +113,7 @@ def classify_reviews(reviews):
     results.sort(key=lambda x: x["Count"], reverse=True)
     results = results[:MAX_THEMATICS]
     
-    return results
+    return results, consolidated_reviews
 
 def consolidate_themes(themes):
     """Use OpenAI to consolidate similar themes into a mapping dictionary."""
@@ -122,7 +125,7 @@ def consolidate_themes(themes):
         response = client.chat.completions.create(
             model=OPENAI_MODEL,
             messages=[
-                {"role": "system", "content": "You are a helpful assistant that groups similar themes together. Map each theme to a broader category from this list: moderation, customer support, website usability, trustworthiness, overall satisfaction."},
+                {"role": "system", "content": f"You are a helpful assistant that groups similar themes together. Map each theme to a broader category from this list: {', '.join(THEME_CATEGORIES)}."},
                 {"role": "user", "content": f"Here are themes extracted from customer reviews: {theme_list}\n\nFor each theme, map it to one of the broader categories. Respond in this format - 'original theme: broader category' with each mapping on a new line."}
             ],
             temperature=0.2,
@@ -136,7 +139,7 @@ def consolidate_themes(themes):
         for mapping in mappings:
             if ':' in mapping:
                 orig, broad = mapping.split(':', 1)
-                theme_map[orig.strip().lower()] = broad.strip().lower()
+                theme_map[orig.strip().lower()] = broad.strip().strip('.').lower()
         
         return theme_map
     except Exception as e:
@@ -192,11 +195,18 @@ def main():
     
     print(f"Found {len(reviews)} reviews to analyze.")
     
+    # Keep the trends of the previous run before the workbook is overwritten
+    previous_trends = read_trend_sheets(OUTPUT_FILE)
+    
     # Classify reviews
-    analysis_results = classify_reviews(reviews)
+    analysis_results, theme_reviews = classify_reviews(reviews)
     
     # Save results
     save_results(analysis_results, OUTPUT_FILE)
+    
+    # Add weekly and monthly trends of the broad categories, which stay the same across runs
+    category_reviews = {category: theme_reviews.get(category, []) for category in THEME_CATEGORIES}
+    write_trend_sheets(OUTPUT_FILE, df, category_reviews, COMMENT_COLUMN, previous=previous_trends, label_name="Theme")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,174 @@
+import bisect
+import queue
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+LATENCY_BUCKETS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000]
+BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64]
+
+# '1: answer', '2. answer', '- **3:** answer'...
+NUMBERED_LINE = re.compile(r'^\s*(?:[-*]\s+)?\**\[?(\d+)\]?\**\s*[:.)-]\s*\**\s*(.*)$')
+# '### 1', '### 2.', '### Plainte 3'...
+YES_NO = re.compile(r'\W*(YES|NO)\b', re.IGNORECASE)
+SECTION_HEADER = re.compile(r'^\s*###\s*(?:\w+\s+)?(\d+)\s*[.:]?\s*$', re.MULTILINE)
+
+def numbered_reviews(reviews):
+    return '\n'.join(f"{n}: {' '.join(str(review).split())}" for n, review in enumerate(reviews, 1))
+
+def parse_numbered_lines(content, count):
+    """Parse 'n: answer' lines into {index: answer} for indices 0..count-1."""
+    answers = {}
+    for line in content.split('\n'):
+        match = NUMBERED_LINE.match(line)
+        if match:
+            idx = int(match.group(1)) - 1
+            if 0 <= idx < count and idx not in answers:
+                answers[idx] = match.group(2).strip()
+    return answers
+
+def parse_yes_no(answer):
+    """True / False from the leading YES or NO of an answer ('Yes, ...', 'NO.'), None otherwise."""
+    match = YES_NO.match(answer or '')
+    return match.group(1).upper() == 'YES' if match else None
+
+def numbered_sections(texts):
+    return '\n\n'.join(f"### {n}\n{text}" for n, text in enumerate(texts, 1))
+
+def parse_sections(content, count):
+    """Parse '### n' sections into {index: text} for indices 0..count-1."""
+    parts = SECTION_HEADER.split(content)
+    sections = {}
+    for number, text in zip(parts[1::2], parts[2::2]):
+        idx = int(number) - 1
+        if 0 <= idx < count and idx not in sections:
+            sections[idx] = text.strip()
+    return sections
+
+class Histogram:
+    """Thread-safe cumulative histogram (bucket upper bounds, last bucket is +Inf)."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = list(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        with self.lock:
+            self.counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.count += 1
+            self.total += value
+
+    def observe_since(self, start):
+        """Record the time elapsed since a time.perf_counter() start, in milliseconds."""
+        self.observe((time.perf_counter() - start) * 1000)
+
+    def snapshot(self):
+        with self.lock:
+            counts = list(self.counts)
+            count, total = self.count, self.total
+        buckets, cumulative = {}, 0
+        for bound, n in zip(self.buckets + ['+Inf'], counts):
+            cumulative += n
+            buckets[str(bound)] = cumulative
+        return {
+            "count": count,
+            "sum": round(total, 3),
+            "mean": round(total / count, 3) if count else 0.0,
+            "buckets": buckets,
+        }
+
+class ResultCache:
+    """Small thread-safe LRU cache keyed by the request payload."""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.data = OrderedDict()
+        self.hits = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            if key not in self.data:
+                return None
+            self.hits += 1
+            self.data.move_to_end(key)
+            return self.data[key]
+
+    def put(self, key, value):
+        with self.lock:
+            self.data[key] = value
+            self.data.move_to_end(key)
+            if len(self.data) > self.max_size:
+                self.data.popitem(last=False)
+
+class MicroBatcher:
+    """Group items submitted concurrently into shared calls to batch_fn.
+
+    An item waits at most max_wait seconds for others to join its batch; a batch
+    is dispatched as soon as it reaches max_batch_size or the deadline expires.
+    batch_fn receives a list of items and must return a list of results in order; an
+    exception instance in that list fails only its item, an exception raised fails the batch.
+    """
+
+    def __init__(self, name, batch_fn, max_batch_size, max_wait, max_concurrent_batches):
+        self.name = name
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.pending = queue.Queue()
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrent_batches,
+                                           thread_name_prefix=f"{name}-batch")
+        self.batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+        self.upstream_latency_ms = Histogram()
+        self.thread = threading.Thread(target=self._collect, name=f"{name}-collector", daemon=True)
+        self.thread.start()
+
+    def submit(self, item):
+        future = Future()
+        self.pending.put((item, future))
+        return future
+
+    def _collect(self):
+        while True:
+            batch = [self.pending.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.pending.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self.executor.submit(self._run, batch)
+
+    def _run(self, batch):
+        items = [item for item, _ in batch]
+        start = time.perf_counter()
+        try:
+            results = self.batch_fn(items)
+            if len(results) != len(items):
+                raise RuntimeError(f"{self.name}: got {len(results)} results for {len(items)} items")
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        finally:
+            self.upstream_latency_ms.observe_since(start)
+            self.batch_sizes.observe(len(batch))
+        for (_, future), result in zip(batch, results):
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def stats(self):
+        return {
+            "batch_size": self.batch_sizes.snapshot(),
+            "upstream_latency_ms": self.upstream_latency_ms.snapshot(),
+        }
@@ -6,6 +6,8 @@ import openai
 from dotenv import load_dotenv
 import PyPDF2
 
+OPENAI_MODEL = "gpt-4-1106-preview"
+
 def extract_pdf_text(pdf_path):
     """Extract all text from a PDF file."""
     text = ""
@@ -15,20 +17,26 @@ def extract_pdf_text(pdf_path):
             text += page.extract_text() + "\n"
     return text
 
-def build_prompt(row, guidelines_text):
+def format_complaint(row):
     """
-    Construit le prompt à envoyer à OpenAI pour une plainte donnée, en se basant uniquement sur les guidelines Trustpilot.
+    Met en forme les informations d'une plainte (une ligne de la feuille 'dataset').
     """
-    prompt = f"""
-Voici les informations d'une plainte utilisateur suite au retrait de son avis sur Trustpilot :
-
-ID : {row['ID']}
+    return f"""ID : {row['ID']}
 Nom de la société : {row['Company Name']}
 Nom de l'utilisateur : {row['User Name']}
 Avis détaillé : {row['Detailed Review']}
 Raison du retrait (Trustpilot) : {row['Reason for Removal']}
 Note de l'avis : {row['Star Rating']}
-Commentaire de la société : {row['Company Comment']}
+Commentaire de la société : {row['Company Comment']}"""
+
+def build_prompt(row, guidelines_text):
+    """
+    Construit le prompt à envoyer à OpenAI pour une plainte donnée, en se basant uniquement sur les guidelines Trustpilot.
+    """
+    prompt = f"""
+Voici les informations d'une plainte utilisateur suite au retrait de son avis sur Trustpilot :
+
+{format_complaint(row)}
 
 Voici les guidelines officielles Trustpilot :
 {guidelines_text}
@@ -42,6 +50,20 @@ Nouvelle formulation : ...
 """
     return prompt
 
+def split_output(output):
+    """
+    Sépare la réponse d'OpenAI en (explication, reformulation).
+    """
+    explication = ""
+    reformulation = ""
+    if "Nouvelle formulation :" in output:
+        parts = output.split("Nouvelle formulation :", 1)
+        explication = parts[0].replace("Explication :", "").strip()
+        reformulation = parts[1].strip()
+    else:
+        explication = output
+    return explication, reformulation
+
 import glob
 
 def main():
@@ -82,21 +104,13 @@ def main():
         prompt = build_prompt(row, guidelines_text)
         try:
             response = openai.chat.completions.create(
-                model="gpt-4-1106-preview",
+                model=OPENAI_MODEL,
                 messages=[{"role": "user", "content": prompt}],
                 max_tokens=600,
                 temperature=0.3
             )
             output = response.choices[0].message.content.strip()
-            # Séparation explication / reformulation
-            explication = ""
-            reformulation = ""
-            if "Nouvelle formulation :" in output:
-                parts = output.split("Nouvelle formulation :", 1)
-                explication = parts[0].replace("Explication :", "").strip()
-                reformulation = parts[1].strip()
-            else:
-                explication = output
+            explication, reformulation = split_output(output)
             result_dict = row.to_dict()
             result_dict["Explication"] = explication
             result_dict["Nouvelle formulation"] = reformulation
@@ -4,6 +4,7 @@ import os
 from tqdm import tqdm
 import time
 from dotenv import load_dotenv, find_dotenv
+from trend_report import read_trend_sheets, write_trend_sheets
 load_dotenv(find_dotenv("setvar.env"))
 
 # Configuration
@@ -135,11 +136,18 @@ def main():
     
     print(f"Found {len(reviews_dict)} reviews to analyze.")
     
+    # Keep the trends of the previous run before the workbook is overwritten
+    previous_trends = read_trend_sheets(OUTPUT_FILE)
+    
     # Identify reviews about review removal
     removal_reviews = identify_removal_reviews(reviews_dict)
     
     # Save results
     save_results(removal_reviews, OUTPUT_FILE)
+    
+    # Add weekly and monthly trends of these reviews
+    review_labels = {"Review removal": [row["Review_Index"] for row in removal_reviews]}
+    write_trend_sheets(OUTPUT_FILE, df, review_labels, COMMENT_COLUMN, previous=previous_trends, label_name="Topic")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
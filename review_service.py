@@ -0,0 +1,376 @@
+import argparse
+import importlib.util
+import json
+import os
+import re
+import socketserver
+import stat
+import time
+from concurrent.futures import TimeoutError as FutureTimeout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from openai import OpenAI
+from dotenv import load_dotenv, find_dotenv
+load_dotenv(find_dotenv("setvar.env"))
+
+import Reviews_Classification
+import focus_on_review_removal
+import focus_on_review_flagging
+from batching import (Histogram, MicroBatcher, ResultCache, numbered_reviews,
+                      numbered_sections, parse_numbered_lines, parse_sections, parse_yes_no)
+
+# Configuration
+HOST = '127.0.0.1'
+PORT = 8765
+GUIDELINES_FILE = 'trustpilot_guidelines.pdf'
+MAX_BATCH_SIZE = 16        # Max reviews sent in one upstream call
+EXPLICATION_TOKENS = 600   # Completion tokens per explained complaint, as in the explication script
+EXPLICATION_MAX_BATCH_SIZE = 6  # 6 x 600 tokens stays under the 4096 completion tokens of gpt-4-1106-preview
+MAX_WAIT_MS = 50           # Max time a request waits for others to join its batch
+MAX_CONCURRENT_BATCHES = 4 # Upstream calls in flight per endpoint
+CACHE_SIZE = 4096          # Results kept in memory per endpoint
+RELEVANCE_THRESHOLD = 3    # Same threshold as the focus scripts
+UPSTREAM_TIMEOUT = 60      # Seconds before an OpenAI call is abandoned
+REQUEST_TIMEOUT = 120      # Seconds a request waits for its batches before answering 504
+
+# One client shared by every endpoint
+if not os.getenv('OPENAI_API_KEY'):
+    raise ValueError("Please set your OPENAI_API_KEY environment variable")
+client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'), timeout=UPSTREAM_TIMEOUT)
+
+def load_explication_module():
+    """Load 'explication, reformulation.py' (its file name is not importable as is)."""
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'explication, reformulation.py')
+    spec = importlib.util.spec_from_file_location('explication_reformulation', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+explication = load_explication_module()
+
+EXPLICATION_COLUMNS = ['ID', 'Company Name', 'User Name', 'Detailed Review',
+                       'Reason for Removal', 'Star Rating', 'Company Comment']
+
+# Detection, scoring and detail criteria of the focus scripts, asked for a whole batch at once
+FOCUS = {
+    'removal': {
+        'model': focus_on_review_removal.OPENAI_MODEL,
+        'criteria': "mentions that reviews have been removed, deleted, filtered, censored, or moderated in any way",
+        'topic': "review removal/deletion/censorship/moderation",
+        'central_theme': "review manipulation or removal",
+        'questions': "1. What platform or company removed reviews?\n2. What reason (if any) is given for removal?\n3. How many reviews were allegedly removed?",
+    },
+    'flagging': {
+        'model': focus_on_review_flagging.OPENAI_MODEL,
+        'criteria': "mentions that a review was flagged and the user was dissatisfied with the outcome",
+        'topic': "dissatisfaction with flagged reviews on Trustpilot",
+        'central_theme': "frustration with Trustpilot’s flagging system",
+        'questions': "1. Why was the review flagged?\n2. What response did Trustpilot give?\n3. What specific frustrations did the reviewer express?",
+    },
+}
+
+class UpstreamError(Exception):
+    """OpenAI gave no usable answer for an item; the item is failed and never cached."""
+
+def is_too_short(review):
+    """Same rule as the batch scripts: skip empty or very short reviews."""
+    return not review or len(str(review).strip()) < 5
+
+def ask(model, messages, temperature, max_tokens):
+    """One OpenAI call; errors propagate so that the whole batch is failed."""
+    response = client.chat.completions.create(
+        model=model,
+        messages=messages,
+        temperature=temperature,
+        max_tokens=max_tokens
+    )
+    return response.choices[0].message.content.strip()
+
+def tag_themes_batch(reviews):
+    """Identify the main themes of several reviews with a single OpenAI call."""
+    content = ask(Reviews_Classification.OPENAI_MODEL, [
+        {"role": "system", "content": "You are a helpful assistant that analyzes customer reviews. For each numbered review, identify 2-4 main themes. Focus on customer experience aspects like usability, customer support, moderation issues, etc. Answer with one line per review in the format 'number: keyword, keyword' and nothing else."},
+        {"role": "user", "content": f"Reviews:\n{numbered_reviews(reviews)}\n\nIdentify the main themes in each review."}
+    ], temperature=0.3, max_tokens=40 * len(reviews))
+    answers = parse_numbered_lines(content.lower(), len(reviews))
+    results = []
+    for i in range(len(reviews)):
+        themes = [theme.strip() for theme in answers.get(i, '').split(',') if theme.strip()]
+        results.append({"themes": themes} if themes else UpstreamError(f"No themes for review {i + 1} in the batched answer"))
+    return results
+
+def detect_focus_batch(focus, reviews):
+    """Screen, score and describe several reviews with at most three shared OpenAI calls."""
+    config = FOCUS[focus]
+    content = ask(config['model'], [
+        {"role": "system", "content": f"You are a specialized review analyst. For each numbered review, answer YES if the review {config['criteria']}, NO otherwise. Answer with one line per review in the format 'number: YES' or 'number: NO' and nothing else."},
+        {"role": "user", "content": f"Reviews:\n{numbered_reviews(reviews)}"}
+    ], temperature=0.1, max_tokens=8 * len(reviews))
+    answers = parse_numbered_lines(content, len(reviews))
+    results, positives = [], []
+    for i in range(len(reviews)):
+        mentioned = parse_yes_no(answers.get(i))
+        if mentioned is None:
+            results.append(UpstreamError(f"No YES/NO for review {i + 1} in the batched answer"))
+            continue
+        results.append({"mentioned": mentioned, "Relevance_Score": 0, "Details": "", "flagged": False})
+        if mentioned:
+            positives.append(i)
+    if not positives:
+        return results
+
+    # Score all positives in one call
+    content = ask(config['model'], [
+        {"role": "system", "content": f"You are a specialized review analyst. Score how strongly each numbered review discusses {config['topic']} on a scale from 0-10, where:\n0 = No mention at all\n1-3 = Brief or ambiguous mention\n4-7 = Clear mention but not the main focus\n8-10 = Extensive discussion of {config['central_theme']} as a central theme\nAnswer with one line per review in the format 'number: score' and nothing else."},
+        {"role": "user", "content": f"Reviews:\n{numbered_reviews([reviews[i] for i in positives])}"}
+    ], temperature=0.1, max_tokens=8 * len(positives))
+    scores = parse_numbered_lines(content, len(positives))
+    relevant = []
+    for n, i in enumerate(positives):
+        score = re.search(r'\d+', scores.get(n, ''))
+        if not score:
+            results[i] = UpstreamError(f"No score for review {i + 1} in the batched answer")
+            continue
+        results[i]["Relevance_Score"] = min(int(score.group()), 10)
+        if results[i]["Relevance_Score"] >= RELEVANCE_THRESHOLD:
+            relevant.append(i)
+    if not relevant:
+        return results
+
+    # Extract the details of all relevant reviews in one call
+    content = ask(config['model'], [
+        {"role": "system", "content": f"You are a specialized review analyst. For each numbered review, extract the following details:\n{config['questions']}\nKeep your answer brief and factual. If information is not present, indicate 'Not specified'. Start the answer for each review with a line '### number'."},
+        {"role": "user", "content": numbered_sections([reviews[i] for i in relevant])}
+    ], temperature=0.1, max_tokens=150 * len(relevant))
+    details = parse_sections(content, len(relevant))
+    for n, i in enumerate(relevant):
+        if n in details:
+            results[i].update({"Details": details[n], "flagged": True})
+        else:
+            results[i] = UpstreamError(f"No details for review {i + 1} in the batched answer")
+    return results
+
+def explain_batch(rows, guidelines_text):
+    """Explain several removed reviews in one call, sending the guidelines only once."""
+    if len(rows) == 1:
+        output = ask(explication.OPENAI_MODEL, [{"role": "user", "content": explication.build_prompt(rows[0], guidelines_text)}],
+                     temperature=0.3, max_tokens=EXPLICATION_TOKENS)
+        explanation, reformulation = explication.split_output(output)
+        return [{"Explication": explanation, "Nouvelle formulation": reformulation}]
+    prompt = f"""
+Voici les informations de {len(rows)} plaintes utilisateurs suite au retrait de leur avis sur Trustpilot :
+
+{numbered_sections([explication.format_complaint(row) for row in rows])}
+
+Voici les guidelines officielles Trustpilot :
+{guidelines_text}
+
+Pour chaque plainte :
+1. En te référant aux guidelines et à toutes les informations de la plainte, explique à l'utilisateur pourquoi son avis a été supprimé.
+2. Propose une reformulation conforme aux guidelines et aux autres informations de la plainte, afin d'éviter tout problème de suppression.
+
+Présente la réponse sous la forme, pour chaque plainte :
+### numéro
+Explication : ...
+Nouvelle formulation : ...
+"""
+    output = ask(explication.OPENAI_MODEL, [{"role": "user", "content": prompt}],
+                 temperature=0.3, max_tokens=EXPLICATION_TOKENS * len(rows))
+    sections = parse_sections(output, len(rows))
+    results = []
+    for i in range(len(rows)):
+        if i in sections:
+            explanation, reformulation = explication.split_output(sections[i])
+            results.append({"Explication": explanation, "Nouvelle formulation": reformulation})
+        else:
+            results.append(UpstreamError(f"No answer for complaint {i + 1} in the batched answer"))
+    return results
+
+class ReviewService:
+    """Warm state shared by all requests: batchers, caches, guidelines and metrics."""
+
+    def __init__(self, guidelines_path=GUIDELINES_FILE, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS,
+                 request_timeout=REQUEST_TIMEOUT):
+        self.request_timeout = request_timeout
+        self.guidelines_text = None
+        if os.path.isfile(guidelines_path):
+            print(f"Extracting guidelines text from {guidelines_path}...")
+            self.guidelines_text = explication.extract_pdf_text(guidelines_path)
+        else:
+            print(f"WARNING: {guidelines_path} not found, /explication is disabled.")
+
+        batch_options = {"max_batch_size": max_batch_size, "max_wait": max_wait_ms / 1000,
+                         "max_concurrent_batches": MAX_CONCURRENT_BATCHES}
+        self.batchers = {
+            'classify': MicroBatcher('classify', tag_themes_batch, **batch_options),
+            'removal': MicroBatcher('removal', lambda reviews: detect_focus_batch('removal', reviews), **batch_options),
+            'flagging': MicroBatcher('flagging', lambda reviews: detect_focus_batch('flagging', reviews), **batch_options),
+            'explication': MicroBatcher('explication', lambda rows: explain_batch(rows, self.guidelines_text),
+                                        **dict(batch_options, max_batch_size=min(max_batch_size, EXPLICATION_MAX_BATCH_SIZE))),
+        }
+        self.caches = {name: ResultCache(CACHE_SIZE) for name in self.batchers}
+        self.latency_ms = {name: Histogram() for name in self.batchers}
+
+    def empty_result(self, endpoint):
+        if endpoint == 'classify':
+            return {"themes": []}
+        return {"mentioned": False, "Relevance_Score": 0, "Details": "", "flagged": False}
+
+    def process(self, endpoint, items):
+        """Answer a list of items, using the cache first and micro-batching the rest.
+
+        Only successful answers are cached. Raises the first item error, or TimeoutError
+        when the batches are not answered within request_timeout.
+        """
+        cache = self.caches[endpoint]
+        deadline = time.monotonic() + self.request_timeout
+        results = [None] * len(items)
+        futures = {}
+        for i, item in enumerate(items):
+            if endpoint != 'explication' and is_too_short(item):
+                results[i] = self.empty_result(endpoint)
+                continue
+            key = json.dumps(item, sort_keys=True, default=str)
+            cached = cache.get(key)
+            if cached is not None:
+                results[i] = cached
+            else:
+                futures[i] = (key, self.batchers[endpoint].submit(item))
+        error = None
+        for i, (key, future) in futures.items():
+            try:
+                results[i] = future.result(timeout=max(deadline - time.monotonic(), 0))
+            except Exception as e:
+                error = error or e
+                continue
+            cache.put(key, results[i])
+        if error:
+            raise error
+        return results
+
+    def metrics(self):
+        return {
+            name: {
+                "latency_ms": self.latency_ms[name].snapshot(),
+                "cache_hits": self.caches[name].hits,
+                "cache_size": len(self.caches[name].data),
+                "batching": self.batchers[name].stats(),
+            }
+            for name in self.batchers
+        }
+
+class RequestHandler(BaseHTTPRequestHandler):
+    """JSON API: POST /classify, /removal, /flagging, /explication; GET /health, /metrics."""
+
+    service = None  # Set by make_server
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == '/health':
+            self.send_json(200, {"status": "ok"})
+        elif self.path == '/metrics':
+            self.send_json(200, self.service.metrics())
+        else:
+            self.send_json(404, {"error": f"Unknown endpoint {self.path}"})
+
+    def do_POST(self):
+        endpoint = self.path.strip('/')
+        if endpoint not in self.service.batchers:
+            self.send_json(404, {"error": f"Unknown endpoint {self.path}"})
+            return
+        start = time.perf_counter()
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            payload = json.loads(self.rfile.read(length) or b'{}')
+            items = self.parse_items(endpoint, payload)
+        except (ValueError, TypeError) as e:
+            self.send_json(400, {"error": str(e)})
+            return
+        if endpoint == 'explication' and self.service.guidelines_text is None:
+            self.send_json(503, {"error": f"{GUIDELINES_FILE} not found"})
+            return
+        try:
+            results = self.service.process(endpoint, items)
+        except FutureTimeout:
+            self.send_json(504, {"error": f"No answer within {self.service.request_timeout} s"})
+            return
+        except Exception as e:
+            self.send_json(502, {"error": f"Error processing request: {e}"})
+            return
+        finally:
+            self.service.latency_ms[endpoint].observe_since(start)
+        self.send_json(200, {"results": results})
+
+    def parse_items(self, endpoint, payload):
+        """Accept {"review": ...} / {"reviews": [...]} or {"row": {...}} / {"rows": [...]}."""
+        if not isinstance(payload, dict):
+            raise ValueError("Request body must be a JSON object")
+        single, many = ('row', 'rows') if endpoint == 'explication' else ('review', 'reviews')
+        if single in payload:
+            items = [payload[single]]
+        elif many in payload and isinstance(payload[many], list):
+            items = payload[many]
+        else:
+            raise ValueError(f"Request body must contain '{single}' or a '{many}' list")
+        if endpoint == 'explication':
+            for row in items:
+                if not isinstance(row, dict):
+                    raise ValueError("Each row must be a JSON object")
+                missing = [column for column in EXPLICATION_COLUMNS if column not in row]
+                if missing:
+                    raise ValueError(f"Missing columns in row: {', '.join(missing)}")
+        return items
+
+    def address_string(self):
+        # Unix socket clients have no (host, port) address
+        return self.client_address[0] if self.client_address else 'unix'
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+def make_server(service, host=HOST, port=PORT, unix_socket=None):
+    RequestHandler.service = service
+    if unix_socket:
+        if os.path.exists(unix_socket):
+            # Only replace a stale socket, never another kind of file
+            if not stat.S_ISSOCK(os.stat(unix_socket).st_mode):
+                raise FileExistsError(f"{unix_socket} exists and is not a Unix socket")
+            os.remove(unix_socket)
+        return ThreadingUnixHTTPServer(unix_socket, RequestHandler)
+    return ThreadingHTTPServer((host, port), RequestHandler)
+
+def main():
+    parser = argparse.ArgumentParser(description="Local review classification service.")
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--unix-socket', help="Listen on this Unix socket path instead of TCP")
+    parser.add_argument('--max-batch-size', type=int, default=MAX_BATCH_SIZE)
+    parser.add_argument('--max-wait-ms', type=float, default=MAX_WAIT_MS)
+    parser.add_argument('--request-timeout', type=float, default=REQUEST_TIMEOUT)
+    parser.add_argument('--guidelines', default=GUIDELINES_FILE)
+    args = parser.parse_args()
+
+    service = ReviewService(args.guidelines, args.max_batch_size, args.max_wait_ms, args.request_timeout)
+    try:
+        server = make_server(service, args.host, args.port, args.unix_socket)
+    except FileExistsError as e:
+        parser.error(str(e))
+    print(f"Listening on {args.unix_socket or f'http://{args.host}:{args.port}'}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if args.unix_socket and os.path.exists(args.unix_socket) and stat.S_ISSOCK(os.stat(args.unix_socket).st_mode):
+            os.remove(args.unix_socket)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+import threading
+import time
+
+import pytest
+
+from batching import (Histogram, MicroBatcher, ResultCache, numbered_reviews,
+                      parse_numbered_lines, parse_sections, parse_yes_no)
+
+
+def make_batcher(batch_fn, max_batch_size=4, max_wait=0.05):
+    return MicroBatcher('test', batch_fn, max_batch_size=max_batch_size,
+                        max_wait=max_wait, max_concurrent_batches=2)
+
+
+def test_numbered_reviews_flattens_whitespace():
+    assert numbered_reviews(["Great\nservice", "  Bad  support "]) == "1: Great service\n2: Bad support"
+
+
+def test_parse_numbered_lines_model_output():
+    content = (
+        "Here are the themes for each review:\n"
+        "1: moderation, review removal\n"
+        "2. customer support\n"
+        "3) usability\n"
+        "- **4:** trustworthiness\n"
+        "**5**: overall satisfaction\n"
+        "6: duplicated\n"
+        "6: ignored\n"
+        "12: out of range\n"
+    )
+    answers = parse_numbered_lines(content, 6)
+    assert answers == {
+        0: "moderation, review removal",
+        1: "customer support",
+        2: "usability",
+        3: "trustworthiness",
+        4: "overall satisfaction",
+        5: "duplicated",
+    }
+
+
+def test_parse_numbered_lines_missing_items():
+    assert parse_numbered_lines("1: YES\n3: NO", 3) == {0: "YES", 2: "NO"}
+
+
+def test_parse_yes_no_leading_token():
+    answers = parse_numbered_lines("1: YES.\n2: Yes, the reviewer says it was deleted\n3: no\n"
+                                   "4: **NO**\n5: Not sure\n6: NOTHING", 7)
+    assert [parse_yes_no(answers.get(i)) for i in range(7)] == [True, True, False, False, None, None, None]
+
+
+def test_parse_sections_model_output():
+    content = (
+        "Voici les réponses :\n\n"
+        "### 1\n"
+        "Explication : L'avis contient des propos injurieux.\n"
+        "Nouvelle formulation : Le service client n'a pas répondu.\n\n"
+        "### Plainte 2.\n"
+        "Explication : Avis non basé sur une expérience réelle.\n"
+        "Nouvelle formulation : ...\n"
+        "### 5\n"
+        "Hors limites\n"
+    )
+    sections = parse_sections(content, 2)
+    assert sorted(sections) == [0, 1]
+    assert sections[0].startswith("Explication : L'avis contient")
+    assert sections[0].endswith("Le service client n'a pas répondu.")
+    assert sections[1].startswith("Explication : Avis non basé")
+
+
+def test_parse_sections_keeps_markdown_inside_sections():
+    sections = parse_sections("### 1\n1. Trustpilot\n2. Not specified\n#### Note\nx", 1)
+    assert sections == {0: "1. Trustpilot\n2. Not specified\n#### Note\nx"}
+
+
+def test_histogram_cumulative_buckets():
+    histogram = Histogram([10, 100])
+    for value in (5, 10, 50, 500):
+        histogram.observe(value)
+    snapshot = histogram.snapshot()
+    assert snapshot["count"] == 4
+    assert snapshot["sum"] == 565
+    assert snapshot["buckets"] == {"10": 2, "100": 3, "+Inf": 4}
+
+
+def test_result_cache_evicts_least_recently_used():
+    cache = ResultCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.hits == 3
+
+
+def test_micro_batcher_dispatches_full_batch_before_deadline():
+    batches = []
+
+    def batch_fn(items):
+        batches.append(list(items))
+        return [item * 2 for item in items]
+
+    batcher = make_batcher(batch_fn, max_batch_size=3, max_wait=10)
+    start = time.monotonic()
+    futures = [batcher.submit(i) for i in range(3)]
+    assert [future.result(timeout=2) for future in futures] == [0, 2, 4]
+    assert time.monotonic() - start < 2
+    assert batches == [[0, 1, 2]]
+
+
+def test_micro_batcher_dispatches_partial_batch_at_deadline():
+    batches = []
+
+    def batch_fn(items):
+        batches.append(list(items))
+        return items
+
+    batcher = make_batcher(batch_fn, max_batch_size=100, max_wait=0.05)
+    futures = [batcher.submit(i) for i in range(2)]
+    assert [future.result(timeout=2) for future in futures] == [0, 1]
+    assert batches == [[0, 1]]
+    assert batcher.stats()["batch_size"]["count"] == 1
+
+
+def test_micro_batcher_groups_concurrent_submissions_in_order():
+    batcher = make_batcher(lambda items: [f"result {item}" for item in items], max_batch_size=4)
+    results = {}
+
+    def worker(i):
+        results[i] = batcher.submit(i).result(timeout=2)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == {i: f"result {i}" for i in range(10)}
+    assert batcher.stats()["batch_size"]["count"] < 10
+
+
+def test_micro_batcher_batch_exception_fails_every_item():
+    def batch_fn(items):
+        raise RuntimeError("rate limited")
+
+    batcher = make_batcher(batch_fn)
+    futures = [batcher.submit(i) for i in range(3)]
+    for future in futures:
+        with pytest.raises(RuntimeError, match="rate limited"):
+            future.result(timeout=2)
+
+
+def test_micro_batcher_item_exception_fails_only_that_item():
+    batcher = make_batcher(lambda items: [ValueError("no answer") if item == 1 else item for item in items])
+    futures = [batcher.submit(i) for i in range(3)]
+    assert futures[0].result(timeout=2) == 0
+    assert futures[2].result(timeout=2) == 2
+    with pytest.raises(ValueError, match="no answer"):
+        futures[1].result(timeout=2)
+
+
+def test_micro_batcher_rejects_wrong_result_count():
+    batcher = make_batcher(lambda items: items[:-1])
+    futures = [batcher.submit(i) for i in range(2)]
+    for future in futures:
+        with pytest.raises(RuntimeError, match="got 1 results for 2 items"):
+            future.result(timeout=2)
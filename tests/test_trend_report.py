@@ -0,0 +1,124 @@
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("openpyxl")
+
+import trend_report
+
+
+def make_reviews(dates, companies=None):
+    df = pd.DataFrame({'text': [f"review {i}" for i in range(len(dates))],
+                       'published_date': pd.to_datetime(dates)})
+    if companies is not None:
+        df['Company Name'] = companies
+    return df
+
+
+def run(tmp_path, df, review_labels, previous=None, company_column=None):
+    output_file = tmp_path / "output.xlsx"
+    pd.DataFrame({'Theme': ['TOTAL']}).to_excel(output_file, index=False)
+    trend_report.write_trend_sheets(output_file, df, review_labels, 'text', previous=previous,
+                                    company_column=company_column)
+    return trend_report.read_trend_sheets(output_file)
+
+
+def sorted_sheet(sheet, by=('Period', 'Theme')):
+    return sheet.sort_values(list(by)).reset_index(drop=True)
+
+
+MONTHLY_DATES = ['2025-01-05', '2025-01-20', '2025-02-03', '2025-02-10', '2025-02-25',
+                 '2025-03-01', '2025-03-15', '2025-04-02', '2025-04-20', '2025-05-05']
+MONTHLY_LABELS = {'moderation': [0, 2, 3, 5, 7, 8, 9], 'customer support': [1, 4, 6, 9]}
+
+
+def test_monthly_counts_share_and_rolling(tmp_path):
+    sheets = run(tmp_path, make_reviews(MONTHLY_DATES), MONTHLY_LABELS)
+    monthly = sheets['Trend Monthly']
+    moderation = monthly[monthly['Theme'] == 'moderation'].reset_index(drop=True)
+    assert moderation['Reviews'].tolist() == [1, 2, 1, 2, 1]
+    assert moderation['Total reviews'].tolist() == [2, 3, 2, 2, 1]
+    assert moderation['Share (%)'].tolist() == [50.0, 66.7, 50.0, 100.0, 100.0]
+    assert moderation['Change vs previous (%)'].tolist()[1:] == [100.0, -50.0, 100.0, -50.0]
+    assert moderation['Rolling 3 sum'].tolist() == [1, 3, 4, 5, 4]
+
+
+def test_incremental_run_matches_full_run(tmp_path):
+    df = make_reviews(MONTHLY_DATES)
+    full = run(tmp_path, df, MONTHLY_LABELS)
+
+    # First run on the reviews up to mid-March, second run on everything
+    early = df.iloc[:7]
+    early_labels = {label: [i for i in indices if i < 7] for label, indices in MONTHLY_LABELS.items()}
+    previous = run(tmp_path, early, early_labels)
+    incremental = run(tmp_path, df, MONTHLY_LABELS, previous=previous)
+
+    for sheet_name in full:
+        pd.testing.assert_frame_equal(sorted_sheet(incremental[sheet_name]), sorted_sheet(full[sheet_name]))
+
+
+def test_last_stored_period_kept_when_input_does_not_cover_it(tmp_path):
+    df = make_reviews(MONTHLY_DATES)
+    full = run(tmp_path, df, MONTHLY_LABELS)
+
+    # Only the reviews that arrived since April are exported
+    previous = run(tmp_path, df.iloc[:7], {label: [i for i in indices if i < 7]
+                                          for label, indices in MONTHLY_LABELS.items()})
+    new = df.iloc[7:].reset_index(drop=True)
+    new_labels = {label: [i - 7 for i in indices if i >= 7] for label, indices in MONTHLY_LABELS.items()}
+    incremental = run(tmp_path, new, new_labels, previous=previous)
+
+    pd.testing.assert_frame_equal(sorted_sheet(incremental['Trend Monthly']), sorted_sheet(full['Trend Monthly']))
+
+
+def test_cumulative_input_with_new_reviews_in_last_stored_period(tmp_path):
+    df = make_reviews(MONTHLY_DATES)
+    # First run stops mid-March; the second (cumulative) input adds two more March reviews
+    previous = run(tmp_path, df.iloc[:6], {label: [i for i in indices if i < 6]
+                                          for label, indices in MONTHLY_LABELS.items()})
+    grown = pd.concat([df, make_reviews(['2025-03-20', '2025-03-28'])], ignore_index=True)
+    labels = {'moderation': MONTHLY_LABELS['moderation'] + [10, 11], 'customer support': MONTHLY_LABELS['customer support']}
+    full = run(tmp_path, grown, labels)
+
+    incremental = run(tmp_path, grown, labels, previous=previous)
+
+    pd.testing.assert_frame_equal(sorted_sheet(incremental['Trend Monthly']), sorted_sheet(full['Trend Monthly']))
+    march = incremental['Trend Monthly']
+    march = march[(march['Period'] == '2025-03-01') & (march['Theme'] == 'moderation')]
+    assert march[['Reviews', 'Total reviews']].values.tolist() == [[3, 4]]
+
+
+def test_rerun_on_same_input_does_not_warn(tmp_path, capsys):
+    df = make_reviews(MONTHLY_DATES)
+    previous = run(tmp_path, df, MONTHLY_LABELS)
+    capsys.readouterr()
+
+    incremental = run(tmp_path, df, MONTHLY_LABELS, previous=previous)
+
+    assert "WARNING" not in capsys.readouterr().out
+    pd.testing.assert_frame_equal(sorted_sheet(incremental['Trend Monthly']), sorted_sheet(previous['Trend Monthly']))
+
+
+def test_reviews_before_last_stored_period_are_not_counted(tmp_path, capsys):
+    df = make_reviews(MONTHLY_DATES)
+    previous = run(tmp_path, df, MONTHLY_LABELS)
+    late_arrival = pd.concat([df, make_reviews(['2025-01-10'])], ignore_index=True)
+    labels = {'moderation': MONTHLY_LABELS['moderation'] + [10], 'customer support': MONTHLY_LABELS['customer support']}
+    capsys.readouterr()
+
+    incremental = run(tmp_path, late_arrival, labels, previous=previous)
+
+    assert "1 new reviews dated before the last stored period" in capsys.readouterr().out
+    pd.testing.assert_frame_equal(sorted_sheet(incremental['Trend Monthly']), sorted_sheet(previous['Trend Monthly']))
+
+
+def test_companies_missing_from_new_input_are_carried_over(tmp_path):
+    df = make_reviews(MONTHLY_DATES, companies=['A', 'B'] * 5)
+    previous = run(tmp_path, df, MONTHLY_LABELS, company_column='Company Name')
+
+    only_a = df[df['Company Name'] == 'A'].reset_index(drop=True)
+    a_labels = {label: [i // 2 for i in indices if i % 2 == 0] for label, indices in MONTHLY_LABELS.items()}
+    incremental = run(tmp_path, only_a, a_labels, previous=previous, company_column='Company Name')
+
+    by = ('Company', 'Period', 'Theme')
+    pd.testing.assert_frame_equal(sorted_sheet(incremental['Trend Monthly'], by),
+                                  sorted_sheet(previous['Trend Monthly'], by))
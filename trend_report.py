@@ -0,0 +1,189 @@
+import os
+import numpy as np
+import pandas as pd
+
+# Configuration
+DATE_COLUMN = 'published_date'
+COMPANY_COLUMN = None  # Set to e.g. 'Company Name' to split the trends per company
+FREQUENCIES = {'Weekly': 'W', 'Monthly': 'M'}
+ROLLING_WINDOWS = {'Weekly': 4, 'Monthly': 3}  # Number of periods in each rolling window
+SHEET_PREFIX = 'Trend '
+ALL_COMPANIES = 'All'
+
+def read_trend_sheets(output_file):
+    """Read the trend sheets of a previous run, before the workbook gets overwritten."""
+    if not os.path.isfile(output_file):
+        return {}
+    try:
+        sheets = pd.read_excel(output_file, sheet_name=None)
+    except Exception as e:
+        print(f"Error reading previous trend sheets: {e}")
+        return {}
+    return {name: sheet for name, sheet in sheets.items() if name.startswith(SHEET_PREFIX)}
+
+def review_periods(df, comment_column, freq, date_column=DATE_COLUMN, company_column=COMPANY_COLUMN):
+    """Return the period and company of each analyzed review.
+
+    Rows are indexed like the review lists built by read_reviews (non-empty comments, in order).
+    """
+    reviewed = df[df[comment_column].notna()]
+    dates = pd.to_datetime(reviewed[date_column], errors='coerce')
+    if dates.dt.tz is not None:
+        dates = dates.dt.tz_localize(None)
+    companies = reviewed[company_column].fillna('').astype(str).values if company_column else ALL_COMPANIES
+    periods = pd.DataFrame({'Company': companies, 'Period': dates.dt.to_period(freq).values})
+    return periods.dropna(subset=['Period'])
+
+def label_frame(review_labels):
+    """Turn {label: [review indices]} into a (Review_Index, Label) frame."""
+    labels = list(review_labels.keys())
+    indices = [np.asarray(list(review_labels[label]), dtype=int) for label in labels]
+    frame = pd.DataFrame({
+        'Review_Index': np.concatenate(indices) if indices else np.array([], dtype=int),
+        'Label': np.repeat(labels, [len(idx) for idx in indices]),
+    })
+    return frame.drop_duplicates()
+
+def aggregate_buckets(periods, labels):
+    """Count labelled reviews and all reviews per (Company, Period) bucket."""
+    labelled = labels.join(periods, on='Review_Index', how='inner')
+    counts = labelled.groupby(['Company', 'Period', 'Label']).size().unstack('Label', fill_value=0)
+    totals = periods.groupby(['Company', 'Period']).size().rename('Total reviews')
+    return pd.concat([counts, totals], axis=1).fillna(0).astype(int)
+
+def previous_buckets(previous, freq, label_name):
+    """Rebuild the bucket counts stored in a trend sheet written by a previous run."""
+    if previous is None or previous.empty:
+        return None, None
+    previous = previous.copy()
+    if 'Company' not in previous.columns:
+        previous['Company'] = ALL_COMPANIES
+    previous['Period'] = pd.to_datetime(previous['Period']).dt.to_period(freq)
+    counts = previous.pivot_table(index=['Company', 'Period'], columns=label_name,
+                                  values='Reviews', aggfunc='sum', fill_value=0)
+    totals = previous.groupby(['Company', 'Period'])['Total reviews'].first()
+    return pd.concat([counts, totals], axis=1).fillna(0).astype(int), previous
+
+def percent_change(current, previous):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        change = np.where(previous > 0, (current - previous) / previous * 100, np.nan)
+    return np.round(change, 1)
+
+def trend_rows(company, periods, counts, totals, seed_counts, window, label_name, labels):
+    """Build the trend rows of new periods.
+
+    Rolling sums are extended from the last `window` stored periods (seed) instead of
+    being recomputed over the whole history.
+    """
+    padded = np.vstack([np.zeros((window - len(seed_counts), counts.shape[1])), seed_counts, counts])
+    cumulative = np.vstack([np.zeros((1, counts.shape[1])), np.cumsum(padded, axis=0)])
+    rolling = cumulative[window:] - cumulative[:-window]  # Window ending at the last seed row, then each new row
+    previous_counts = padded[window - 1:-1]
+
+    n_labels = len(labels)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        share = np.where(totals[:, None] > 0, counts / totals[:, None] * 100, 0.0)
+    return pd.DataFrame({
+        'Company': company,
+        'Period': np.repeat(periods.start_time.date, n_labels),
+        label_name: np.tile(labels, len(periods)),
+        'Reviews': counts.ravel().astype(int),
+        'Total reviews': np.repeat(totals, n_labels).astype(int),
+        'Share (%)': np.round(share, 1).ravel(),
+        'Change vs previous (%)': percent_change(counts, previous_counts).ravel(),
+        f'Rolling {window} sum': rolling[1:].ravel().astype(int),
+        'Rolling change (%)': percent_change(rolling[1:], rolling[:-1]).ravel(),
+    })
+
+def new_periods(periods, stored_counts):
+    """Keep the reviews of the last stored period of their company and later.
+
+    Earlier periods are already stored and are not aggregated again.
+    """
+    if stored_counts is None:
+        return periods
+    cuts = stored_counts.reset_index().groupby('Company')['Period'].max()
+    cut_start = periods['Company'].map(cuts.dt.start_time)
+    recent = cut_start.isna() | (periods['Period'].dt.start_time >= cut_start)
+    if not recent.all():
+        # Reviews of stored periods were counted by a previous run, unless there are now more of them
+        input_totals = periods[~recent].groupby(['Company', 'Period']).size()
+        stored_totals = stored_counts['Total reviews'].reindex(input_totals.index, fill_value=0)
+        late = int((input_totals - stored_totals).clip(lower=0).sum())
+        if late:
+            print(f"WARNING: {late} new reviews dated before the last stored period are not counted; "
+                  "stored periods are kept as they are.")
+    return periods[recent]
+
+def update_trend(stored_counts, previous, buckets, freq, window, label_name):
+    """Merge freshly aggregated buckets into the trend sheet of a previous run.
+
+    Periods before the last stored one are kept as they are. The last stored period
+    (possibly incomplete at the time) is replaced by `buckets` when it has reviews for
+    it, so the input must be cumulative: it has to hold every review of that period,
+    not only the newly arrived ones. Companies missing from `buckets` are carried over
+    unchanged.
+    """
+    labels = list(buckets.columns.drop('Total reviews')) if buckets is not None else []
+    stored_companies = []
+    if stored_counts is not None:
+        labels += [label for label in stored_counts.columns.drop('Total reviews') if label not in labels]
+        stored_companies = list(stored_counts.index.get_level_values('Company').unique())
+    current_companies = list(buckets.index.get_level_values('Company').unique()) if buckets is not None else []
+    columns = labels + ['Total reviews']
+
+    rows = []
+    for company in stored_companies + [c for c in current_companies if c not in stored_companies]:
+        current = None
+        if company in current_companies:
+            current = buckets.xs(company, level='Company').reindex(columns=columns, fill_value=0)
+        seed = pd.DataFrame(0, index=[], columns=columns)
+        if company in stored_companies:
+            history = stored_counts.xs(company, level='Company').reindex(columns=columns, fill_value=0)
+            cut = history.index.max()
+            stored_rows = previous[previous['Company'] == company]
+            replace_cut = current is not None and cut in current.index
+            kept = stored_rows[stored_rows['Period'] < cut] if replace_cut else stored_rows
+            rows.append(kept.assign(Period=kept['Period'].dt.start_time.dt.date))
+            if current is None:
+                continue
+            seed = history[history.index < cut].tail(window) if replace_cut else history.tail(window)
+            start = cut if replace_cut else cut + 1
+        else:
+            start = current.index.min()
+        current = current.reindex(pd.period_range(start, current.index.max(), freq=freq), fill_value=0)
+        rows.append(trend_rows(company, current.index, current[labels].values.astype(float),
+                               current['Total reviews'].values, seed[labels].values.astype(float),
+                               window, label_name, labels))
+    return pd.concat(rows, ignore_index=True)
+
+def write_trend_sheets(output_file, df, review_labels, comment_column, previous=None,
+                       label_name='Theme', date_column=DATE_COLUMN, company_column=COMPANY_COLUMN):
+    """Add weekly and monthly trend sheets to an existing output workbook.
+
+    review_labels maps each label (theme, topic...) to the indices of its reviews, as
+    returned by read_reviews. previous holds the trend sheets of the previous run
+    (see read_trend_sheets): only reviews from the last stored period on are aggregated.
+    df must hold all reviews of that period (e.g. the full input file), not only new ones.
+    """
+    if df is None or date_column not in df.columns:
+        print(f"WARNING: No '{date_column}' column, trend report skipped.")
+        return
+    labels = label_frame(review_labels)
+    previous = previous or {}
+
+    with pd.ExcelWriter(output_file, engine='openpyxl', mode='a', if_sheet_exists='replace') as writer:
+        for name, freq in FREQUENCIES.items():
+            sheet_name = f"{SHEET_PREFIX}{name}"
+            periods = review_periods(df, comment_column, freq, date_column, company_column)
+            if periods.empty:
+                print(f"WARNING: No valid dates in '{date_column}', trend report skipped.")
+                return
+            stored_counts, stored_rows = previous_buckets(previous.get(sheet_name), freq, label_name)
+            periods = new_periods(periods, stored_counts)
+            buckets = aggregate_buckets(periods, labels) if not periods.empty else None
+            trend = update_trend(stored_counts, stored_rows, buckets, freq, ROLLING_WINDOWS[name], label_name)
+            if not company_column:
+                trend = trend.drop(columns='Company')
+            trend.to_excel(writer, sheet_name=sheet_name, index=False)
+    print(f"Trend sheets saved to {output_file}")